@@ -26,22 +26,89 @@ Exit codes:
 """
 
 import argparse
+import json
 import os
 import sys
+import textwrap
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 # Add parent directory to path for module import
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from github_app.token_generator import GitHubAppTokenGenerator
+from github_app.token_generator import GitHubAppTokenGenerator, cached_get, create_session
 from github_app.mcp_config import MCPConfigGenerator
 
+# Number of repositories listed in the API access check
+REPO_DISPLAY_LIMIT = 10
+
+# Redacted MCP config skeleton, pre-serialized and pre-indented for display;
+# only the command and args placeholders vary between runs
+_REDACTED_TEMPLATE = textwrap.indent(
+    json.dumps(
+        {
+            "mcpServers": {
+                "github": {
+                    "command": "__CMD__",
+                    "args": "__ARGS__",
+                    "env": {"GITHUB_PERSONAL_ACCESS_TOKEN": "[REDACTED]"}
+                }
+            }
+        },
+        indent=2
+    ),
+    "      "
+)
+_ARGS_LINE_INDENT = next(
+    line[:len(line) - len(line.lstrip())]
+    for line in _REDACTED_TEMPLATE.splitlines()
+    if '"__ARGS__"' in line
+)
+
+# Split once around the placeholders so each is substituted exactly once,
+# even if the command or args themselves contain placeholder text
+_TEMPLATE_HEAD, _TEMPLATE_REST = _REDACTED_TEMPLATE.split('"__CMD__"')
+_TEMPLATE_MID, _TEMPLATE_TAIL = _TEMPLATE_REST.split('"__ARGS__"')
+
+
+def format_redacted_config(command: str, args: list[str]) -> str:
+    """
+    Render the redacted MCP config for display.
+    
+    Produces the same text as json.dumps(config, indent=2) indented under
+    the "Config structure:" line, with the token replaced by [REDACTED].
+    """
+    args_json = json.dumps(args, indent=2).replace("\n", "\n" + _ARGS_LINE_INDENT)
+    return (
+        _TEMPLATE_HEAD
+        + json.dumps(command)
+        + _TEMPLATE_MID
+        + args_json
+        + _TEMPLATE_TAIL
+    )
+
+
+# Shared HTTP session for API checks that don't go through the generator
+_session = None
+
+
+def get_session():
+    """Return the module-level requests session, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = create_session()
+    return _session
+
 
 def print_header(text: str) -> None:
-    """Print a section header."""
-    print(f"\n{'='*60}")
-    print(f"  {text}")
-    print(f"{'='*60}\n")
+    """
+    Print a section header.
+    
+    Stdout is block-buffered while the checks run (see main()), so the
+    header flushes the previous section and itself in one write.
+    """
+    print(f"\n{'='*60}\n  {text}\n{'='*60}\n")
+    sys.stdout.flush()
 
 
 def print_success(text: str) -> None:
@@ -59,16 +126,27 @@ def print_info(text: str) -> None:
     print(f"  ℹ️  {text}")
 
 
-def validate_credentials(generator: GitHubAppTokenGenerator) -> bool:
+def validate_credentials(
+    generator: GitHubAppTokenGenerator,
+    app_info_future: Future | None = None
+) -> bool:
     """
     Step 1: Validate that the GitHub App credentials are correct.
     
     This tests the JWT generation and app authentication.
+    
+    Args:
+        generator: Token generator for the app
+        app_info_future: Optional in-flight generator.validate_credentials()
+                         call to report on instead of making a new request
     """
     print_header("Step 1: Validating GitHub App Credentials")
     
     try:
-        app_info = generator.validate_credentials()
+        if app_info_future is not None:
+            app_info = app_info_future.result()
+        else:
+            app_info = generator.validate_credentials()
         print_success(f"App authenticated successfully!")
         print_info(f"App Name: {app_info.get('name', 'Unknown')}")
         print_info(f"App ID: {app_info.get('id', 'Unknown')}")
@@ -96,29 +174,41 @@ def validate_credentials(generator: GitHubAppTokenGenerator) -> bool:
 
 def generate_token(
     generator: GitHubAppTokenGenerator,
-    repositories: list[str] | None = None
+    repositories: list[str] | None = None,
+    token_future: Future | None = None
 ) -> dict | None:
     """
     Step 2: Generate an installation token.
     
     This tests the full token generation flow.
+    
+    Args:
+        generator: Token generator for the app
+        repositories: Optional repository names to scope the token to
+        token_future: Optional in-flight generator.generate_installation_token()
+                      call to report on instead of making a new request
     """
     print_header("Step 2: Generating Installation Token")
     
     try:
         if repositories:
             print_info(f"Scoping token to repositories: {repositories}")
-            result = generator.generate_installation_token(repositories=repositories)
         else:
             print_info("Generating token for all accessible repositories")
-            result = generator.generate_installation_token()
+        # Show what we're waiting on before blocking on the token request
+        sys.stdout.flush()
+        
+        if token_future is not None:
+            result = token_future.result()
+        else:
+            result = generator.generate_installation_token(repositories=repositories)
         
         print_success("Installation token generated successfully!")
         print_info(f"Token prefix: {result['token'][:20]}...")
         print_info(f"Expires at: {result['expires_at']}")
         
         # Calculate expiry
-        seconds_remaining = generator.get_token_expiry_seconds(result["expires_at"])
+        seconds_remaining = generator.get_token_expiry_seconds(result)
         minutes = seconds_remaining // 60
         print_info(f"Valid for: {minutes} minutes")
         
@@ -143,49 +233,82 @@ def generate_token(
         return None
 
 
-def test_api_access(token: str) -> bool:
+def print_repositories(repos: list[dict], total: int) -> None:
+    """Print up to REPO_DISPLAY_LIMIT repositories and a count of the rest."""
+    print_info("Accessible repositories:")
+    lines = [
+        f"      {'🔒' if repo.get('private') else '📂'} {repo['full_name']}"
+        for repo in repos[:REPO_DISPLAY_LIMIT]
+    ]
+    if total > REPO_DISPLAY_LIMIT:
+        lines.append(f"      ... and {total - REPO_DISPLAY_LIMIT} more")
+    print("\n".join(lines))
+
+
+def test_api_access(
+    token: str,
+    token_result: dict | None = None,
+    session=None
+) -> bool:
     """
     Step 3: Test that the token works with the GitHub API.
     
-    Makes a simple API call to verify the token is valid.
+    Makes a simple API call to verify the token is valid. If the token was
+    scoped to repositories, the token response already lists them and the
+    extra API round-trip is skipped, so the token itself is not exercised
+    against the API in that case (GitHub just issued it, which is good
+    enough for this check).
+    
+    Args:
+        token: Installation access token to test
+        token_result: Optional result from generate_installation_token()
+        session: Optional requests session (default: shared module session)
     """
     print_header("Step 3: Testing GitHub API Access")
     
+    scoped_repos = (token_result or {}).get("_repositories")
+    if scoped_repos:
+        print_success(
+            f"Token scoped to {len(scoped_repos)} repositories "
+            "(listed in the token response; API call skipped, token not re-verified)."
+        )
+        print_repositories(scoped_repos, len(scoped_repos))
+        return True
+    
     import requests
     
+    if session is None:
+        session = get_session()
+    
     try:
-        # Test by listing accessible repositories
-        response = requests.get(
+        # Test by listing accessible repositories (only the page we display;
+        # total_count still reports the full installation). Repeat runs are
+        # answered with 304 Not Modified via the ETag cache.
+        data = cached_get(
+            session,
             "https://api.github.com/installation/repositories",
             headers={
                 "Accept": "application/vnd.github+json",
                 "Authorization": f"Bearer {token}",
                 "X-GitHub-Api-Version": "2022-11-28",
             },
-            timeout=30
+            params={"per_page": REPO_DISPLAY_LIMIT},
         )
         
-        if response.status_code != 200:
-            print_error(f"API request failed with status {response.status_code}")
-            print_error(f"Response: {response.text[:200]}")
-            return False
-        
-        data = response.json()
         repos = data.get("repositories", [])
         total = data.get("total_count", len(repos))
         
         print_success(f"API access working! Found {total} accessible repositories.")
         
         if repos:
-            print_info("Accessible repositories:")
-            for repo in repos[:10]:  # Show first 10
-                private = "🔒" if repo.get("private") else "📂"
-                print(f"      {private} {repo['full_name']}")
-            if total > 10:
-                print(f"      ... and {total - 10} more")
+            print_repositories(repos, total)
         
         return True
         
+    except requests.HTTPError as e:
+        print_error(f"API request failed with status {e.response.status_code}")
+        print_error(f"Response: {e.response.text[:200]}")
+        return False
     except Exception as e:
         print_error(f"API test failed: {e}")
         return False
@@ -228,19 +351,8 @@ def test_mcp_config(token: str) -> bool:
         print_info("Token: [REDACTED]")
         
         # Show JSON structure (with redacted token)
-        import json
-        display_config = {
-            "mcpServers": {
-                "github": {
-                    "command": github_config["command"],
-                    "args": github_config.get("args", []),
-                    "env": {"GITHUB_PERSONAL_ACCESS_TOKEN": "[REDACTED]"}
-                }
-            }
-        }
         print_info("Config structure:")
-        for line in json.dumps(display_config, indent=2).split("\n"):
-            print(f"      {line}")
+        print(format_redacted_config(github_config["command"], github_config.get("args", [])))
         
         return True
         
@@ -283,6 +395,21 @@ def main():
     
     args = parser.parse_args()
     
+    # Buffer output within a section instead of flushing every line;
+    # print_header() and the steps flush before anything that blocks.
+    # Restore the caller's setting however we leave (including sys.exit).
+    if not hasattr(sys.stdout, "reconfigure"):
+        return run_validation(args)
+    line_buffering = sys.stdout.line_buffering
+    sys.stdout.reconfigure(line_buffering=False)
+    try:
+        return run_validation(args)
+    finally:
+        sys.stdout.reconfigure(line_buffering=line_buffering)
+
+
+def run_validation(args: argparse.Namespace) -> int:
+    """Run the validation steps for parsed command-line arguments."""
     # Validate required arguments
     missing = []
     if not args.app_id:
@@ -322,19 +449,47 @@ def main():
     # Run tests
     results = []
     
-    # Test 1: Validate credentials
-    if not validate_credentials(generator):
-        sys.exit(1)
-    results.append(True)
+    # Steps 1 and 2 don't depend on each other, so overlap their API
+    # round-trips and report on the results in order. Side effect: the
+    # token request is already in flight while step 1 runs, so a failed
+    # validation may still mint an installation token. It is discarded
+    # unreported and expires on its own within the hour.
+    exit_code = 0
+    token_result = None
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        app_info_future = executor.submit(generator.validate_credentials)
+        token_future = executor.submit(
+            generator.generate_installation_token,
+            repositories=args.repositories
+        )
+        
+        # Test 1: Validate credentials
+        if not validate_credentials(generator, app_info_future=app_info_future):
+            # Don't wait on step 2 if it hasn't started yet
+            token_future.cancel()
+            exit_code = 1
+        else:
+            results.append(True)
+            
+            # Test 2: Generate token
+            token_result = generate_token(
+                generator,
+                repositories=args.repositories,
+                token_future=token_future
+            )
+            if not token_result:
+                exit_code = 2
+            else:
+                results.append(True)
     
-    # Test 2: Generate token
-    token_result = generate_token(generator, repositories=args.repositories)
-    if not token_result:
-        sys.exit(2)
-    results.append(True)
+    # Exit only after the executor has shut down, never from inside it
+    if exit_code == 1:
+        generator.invalidate()
+    if exit_code:
+        sys.exit(exit_code)
     
     # Test 3: Test API access
-    if not test_api_access(token_result["token"]):
+    if not test_api_access(token_result["token"], token_result=token_result):
         sys.exit(3)
     results.append(True)
     
@@ -5,11 +5,44 @@ import sys
 from pathlib import Path
 
 try:
-    from PIL import Image
+    from PIL import Image, ImageChops
 except ImportError:
     print("Error: Pillow not installed. Run: uv pip install Pillow")
     sys.exit(1)
 
+try:
+    import numpy as np
+except ImportError:
+    # Optional: fall back to Pillow's C-level channel operations
+    np = None
+
+
+def _mask_with_numpy(img: Image.Image, threshold: int) -> tuple[Image.Image, int]:
+    """Make pixels with all RGB channels above threshold transparent (NumPy)."""
+    arr = np.array(img, dtype=np.uint8)  # (H, W, 4), writable copy
+    mask = (
+        (arr[..., 0] > threshold)
+        & (arr[..., 1] > threshold)
+        & (arr[..., 2] > threshold)
+    )
+    
+    # Make transparent
+    arr[..., 3][mask] = 0
+    return Image.fromarray(arr, "RGBA"), int(mask.sum())
+
+
+def _mask_with_pillow(img: Image.Image, threshold: int) -> tuple[Image.Image, int]:
+    """Make pixels with all RGB channels above threshold transparent (Pillow)."""
+    r, g, b, a = img.split()
+    
+    # A pixel is near-white when its darkest channel is above the threshold
+    min_rgb = ImageChops.darker(ImageChops.darker(r, g), b)
+    white_mask = min_rgb.point([0 if v > threshold else 255 for v in range(256)])
+    
+    # Make transparent, keeping existing alpha elsewhere
+    img.putalpha(ImageChops.darker(a, white_mask))
+    return img, white_mask.histogram()[0]
+
 
 def remove_white_background(input_path: str, output_path: str | None = None, tolerance: int = 20):
     """
@@ -27,28 +60,19 @@ def remove_white_background(input_path: str, output_path: str | None = None, tol
     
     # Open and convert to RGBA
     img = Image.open(input_file).convert("RGBA")
-    data = img.getdata()
     
-    new_data = []
-    removed_count = 0
+    # Check if pixel is white or near-white
+    # All channels must be above (255 - tolerance)
+    threshold = 255 - tolerance
     
-    for pixel in data:
-        r, g, b, a = pixel
-        
-        # Check if pixel is white or near-white
-        # All channels must be above (255 - tolerance)
-        threshold = 255 - tolerance
-        if r > threshold and g > threshold and b > threshold:
-            # Make transparent
-            new_data.append((r, g, b, 0))
-            removed_count += 1
-        else:
-            new_data.append(pixel)
+    if np is not None:
+        img, removed_count = _mask_with_numpy(img, threshold)
+    else:
+        img, removed_count = _mask_with_pillow(img, threshold)
     
-    img.putdata(new_data)
     img.save(output_path, "PNG")
     
-    total = len(data)
+    total = img.width * img.height
     percent = (removed_count / total) * 100
     print(f"✓ Removed {removed_count:,} white pixels ({percent:.1f}%)")
     print(f"✓ Saved to: {output_path}")
@@ -5,6 +5,7 @@ Tests the GitHubAppTokenGenerator and MCPConfigGenerator classes
 without requiring actual GitHub credentials.
 """
 
+import io
 import json
 import sys
 import tempfile
@@ -19,6 +20,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from github_app.token_generator import GitHubAppTokenGenerator
 from github_app.mcp_config import MCPConfigGenerator, create_mcp_config_for_agent
+from github_app import test_github_app as validation_cli
 
 
 # =============================================================================
@@ -59,6 +61,13 @@ def temp_key_file(sample_private_key):
     Path(f.name).unlink(missing_ok=True)
 
 
+@pytest.fixture(autouse=True)
+def isolated_etag_cache(tmp_path, monkeypatch):
+    """Keep the GitHub ETag cache out of the real home directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    return tmp_path / "cache" / "sapphire-bee" / "github-etags.json"
+
+
 @pytest.fixture
 def token_generator(temp_key_file):
     """Create a GitHubAppTokenGenerator instance."""
@@ -138,38 +147,150 @@ class TestGitHubAppTokenGenerator:
         assert "exp" in decoded
         assert decoded["exp"] > decoded["iat"]
         assert decoded["exp"] - decoded["iat"] == 600  # 10 minutes
+        assert jwt.get_unverified_header(jwt_token)["alg"] == "RS256"
+    
+    def test_generate_jwt_ec_key(self):
+        """Test that EC private keys are detected and signed with ES256."""
+        import jwt
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        
+        private_key = ec.generate_private_key(ec.SECP256R1())
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.pem', delete=False) as f:
+            f.write(pem)
+            temp_path = f.name
+        
+        try:
+            generator = GitHubAppTokenGenerator(
+                app_id="123456",
+                private_key_path=temp_path,
+                installation_id="12345678"
+            )
+            jwt_token = generator.generate_jwt()
+            
+            assert jwt.get_unverified_header(jwt_token)["alg"] == "ES256"
+            decoded = jwt.decode(
+                jwt_token, private_key.public_key(), algorithms=["ES256"]
+            )
+            assert decoded["iss"] == "123456"
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+    
+    @staticmethod
+    def _write_key(path, private_key, pkcs8=False):
+        """Write a private key as unencrypted PEM and return its path."""
+        from cryptography.hazmat.primitives import serialization
+        
+        path.write_bytes(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=(
+                serialization.PrivateFormat.PKCS8 if pkcs8
+                else serialization.PrivateFormat.TraditionalOpenSSL
+            ),
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+        return str(path)
+    
+    def test_pkcs8_ec_key_uses_es256(self, tmp_path):
+        """Test that a PKCS#8-encoded EC P-256 key is signed with ES256."""
+        from cryptography.hazmat.primitives.asymmetric import ec
+        
+        key_path = self._write_key(
+            tmp_path / "ec.pem", ec.generate_private_key(ec.SECP256R1()), pkcs8=True
+        )
+        generator = GitHubAppTokenGenerator(
+            app_id="123456",
+            private_key_path=key_path,
+            installation_id="12345678",
+            algorithm="ES256"
+        )
+        assert generator._algorithm == "ES256"
+    
+    def test_algorithm_mismatch_rejected(self, temp_key_file):
+        """Test that an explicit algorithm must match the key type."""
+        with pytest.raises(ValueError) as exc_info:
+            GitHubAppTokenGenerator(
+                app_id="123456",
+                private_key_path=temp_key_file,
+                installation_id="12345678",
+                algorithm="ES256"
+            )
+        assert "does not match" in str(exc_info.value)
+    
+    @pytest.mark.parametrize("key_type", ["ed25519", "ec-p384"])
+    def test_unsupported_key_type_rejected(self, tmp_path, key_type):
+        """Test that keys other than RSA and EC P-256 fail in __init__."""
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+        
+        if key_type == "ed25519":
+            private_key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            private_key = ec.generate_private_key(ec.SECP384R1())
+        key_path = self._write_key(tmp_path / "key.pem", private_key, pkcs8=True)
+        
+        with pytest.raises(ValueError) as exc_info:
+            GitHubAppTokenGenerator(
+                app_id="123456",
+                private_key_path=key_path,
+                installation_id="12345678"
+            )
+        assert "unsupported" in str(exc_info.value).lower()
+    
+    def test_generate_jwt_cached(self, token_generator):
+        """Test that the JWT is reused until close to expiry."""
+        first = token_generator.generate_jwt()
+        assert token_generator.generate_jwt() == first
+        
+        # Within the refresh margin, a new JWT is signed
+        token_generator._jwt_cache = (first, int(time.time()) + 30)
+        with patch("jwt.encode", return_value="new.jwt.token") as mock_encode:
+            assert token_generator.generate_jwt() == "new.jwt.token"
+            mock_encode.assert_called_once()
     
-    @patch('requests.post')
+    def test_session_uses_pooled_retrying_adapter(self, token_generator):
+        """Test that API calls share a pooled session with retries."""
+        adapter = token_generator._session.get_adapter("https://api.github.com/app")
+        assert adapter.max_retries.total == 3
+        assert 502 in adapter.max_retries.status_forcelist
+    
+    @patch('requests.Session.post')
     def test_generate_installation_token_success(self, mock_post, token_generator):
         """Test successful installation token generation."""
         mock_response = Mock()
         mock_response.status_code = 201
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "token": "ghs_test_token_12345",
             "expires_at": "2024-01-15T12:00:00Z",
             "permissions": {"contents": "read", "issues": "write"},
             "repositories": [{"name": "test-repo"}]
-        }
+        }).encode()
         mock_post.return_value = mock_response
         
         result = token_generator.generate_installation_token()
         
         assert result["token"] == "ghs_test_token_12345"
         assert result["expires_at"] == "2024-01-15T12:00:00Z"
+        assert result["expires_at_epoch"] == 1705320000
         assert result["permissions"]["contents"] == "read"
         assert "test-repo" in result["repositories"]
     
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_generate_installation_token_with_repos(self, mock_post, token_generator):
         """Test installation token generation with repository scope."""
         mock_response = Mock()
         mock_response.status_code = 201
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "token": "ghs_scoped_token",
             "expires_at": "2024-01-15T12:00:00Z",
             "permissions": {},
             "repositories": [{"name": "repo1"}, {"name": "repo2"}]
-        }
+        }).encode()
         mock_post.return_value = mock_response
         
         result = token_generator.generate_installation_token(
@@ -179,8 +300,11 @@ class TestGitHubAppTokenGenerator:
         # Verify the request body included repositories
         call_kwargs = mock_post.call_args[1]
         assert call_kwargs["json"]["repositories"] == ["repo1", "repo2"]
+        
+        assert result["repositories"] == ["repo1", "repo2"]
+        assert result["_repositories"] == [{"name": "repo1"}, {"name": "repo2"}]
     
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_generate_installation_token_failure(self, mock_post, token_generator):
         """Test installation token generation handles API errors."""
         mock_response = Mock()
@@ -192,6 +316,204 @@ class TestGitHubAppTokenGenerator:
         with pytest.raises(Exception):
             token_generator.generate_installation_token()
     
+    @patch('requests.Session.post')
+    def test_generate_installation_token_cached(self, mock_post, token_generator):
+        """Test that a still-valid token is reused without another API call."""
+        mock_response = Mock()
+        mock_response.status_code = 201
+        mock_response.content = json.dumps({
+            "token": "ghs_cached_token",
+            "expires_at": "2099-01-15T12:00:00Z",
+            "permissions": {"contents": "read"},
+        }).encode()
+        mock_post.return_value = mock_response
+        
+        first = token_generator.generate_installation_token()
+        second = token_generator.generate_installation_token()
+        
+        assert first["token"] == second["token"] == "ghs_cached_token"
+        assert mock_post.call_count == 1
+        
+        # Different scope is not served from the cache
+        token_generator.generate_installation_token(repositories=["repo1"])
+        assert mock_post.call_count == 2
+        
+        # Invalidation forces a fresh request
+        token_generator.invalidate()
+        token_generator.generate_installation_token(repositories=["repo1"])
+        assert mock_post.call_count == 3
+    
+    @patch('requests.Session.post')
+    def test_generate_installation_token_refreshes_near_expiry(self, mock_post, token_generator):
+        """Test that a token inside the refresh buffer is not reused."""
+        mock_response = Mock()
+        mock_response.status_code = 201
+        mock_response.content = json.dumps({
+            "token": "ghs_expired_token",
+            "expires_at": "2020-01-15T12:00:00Z",
+            "permissions": {},
+        }).encode()
+        mock_post.return_value = mock_response
+        
+        token_generator.generate_installation_token()
+        token_generator.generate_installation_token()
+        
+        assert mock_post.call_count == 2
+    
+    @patch('time.sleep')
+    @patch('requests.Session.post')
+    def test_generate_installation_token_rate_limited(self, mock_post, mock_sleep, token_generator):
+        """Test that secondary rate limits are retried after Retry-After."""
+        rate_limited = Mock(status_code=429, headers={"Retry-After": "2"})
+        success = Mock(
+            status_code=201,
+            headers={},
+            content=json.dumps({
+                "token": "ghs_after_backoff",
+                "expires_at": "2099-01-15T12:00:00Z",
+                "permissions": {},
+            }).encode()
+        )
+        mock_post.side_effect = [rate_limited, success]
+        
+        result = token_generator.generate_installation_token()
+        
+        assert result["token"] == "ghs_after_backoff"
+        assert mock_post.call_count == 2
+        delay = mock_sleep.call_args[0][0]
+        assert 2 <= delay <= 2.25
+    
+    @patch('requests.Session.post')
+    def test_rate_limit_retry_re_signs_expiring_jwt(self, mock_post, token_generator):
+        """Test that retries after a backoff don't resend an expired JWT."""
+        clock = [1_700_000_000.0]
+        
+        def sleep(seconds):
+            clock[0] += seconds
+        
+        # Cached JWT just outside the refresh margin
+        token_generator._jwt_cache = ("old.jwt", int(clock[0]) + 61)
+        rate_limited = Mock(status_code=429, headers={"Retry-After": "50"})
+        success = Mock(
+            status_code=201,
+            headers={},
+            content=json.dumps({
+                "token": "ghs_after_backoff",
+                "expires_at": "2099-01-15T12:00:00Z",
+                "permissions": {},
+            }).encode()
+        )
+        mock_post.side_effect = [rate_limited, rate_limited, success]
+        
+        with patch('time.time', new=lambda: clock[0]), \
+                patch('time.sleep', new=sleep), \
+                patch('jwt.encode', side_effect=lambda payload, *a, **kw: f"jwt.{payload['iat']}") as mock_encode:
+            result = token_generator.generate_installation_token()
+        
+        assert result["token"] == "ghs_after_backoff"
+        auths = [c[1]["headers"]["Authorization"] for c in mock_post.call_args_list]
+        
+        # First attempt uses the cached JWT; after 50s it is inside the
+        # margin and is re-signed once, then reused for the last attempt
+        assert auths[0] == "Bearer old.jwt"
+        assert auths[1] != auths[0]
+        assert auths[2] == auths[1]
+        assert mock_encode.call_count == 1
+    
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_rate_limit_403_waits_until_reset(self, mock_get, mock_sleep, token_generator):
+        """Test that a 403 rate limit with a near reset waits until the reset."""
+        rate_limited = Mock(
+            status_code=403,
+            headers={
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(int(time.time()) + 10),
+            }
+        )
+        success = Mock(status_code=200, headers={}, content=json.dumps({"id": 1}).encode())
+        mock_get.side_effect = [rate_limited, success]
+        
+        assert token_generator.validate_credentials() == {"id": 1}
+        assert mock_get.call_count == 2
+        delay = mock_sleep.call_args[0][0]
+        assert 8 <= delay <= 10.25
+    
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_rate_limit_long_wait_fails_fast(self, mock_get, mock_sleep, token_generator):
+        """Test that rate limits resetting beyond the sleep cap are not retried."""
+        mock_response = Mock(
+            status_code=403,
+            headers={
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(int(time.time()) + 2400),
+            }
+        )
+        mock_response.raise_for_status.side_effect = Exception("403 rate limit exceeded")
+        mock_get.return_value = mock_response
+        
+        with pytest.raises(Exception):
+            token_generator.validate_credentials()
+        
+        assert mock_get.call_count == 1
+        mock_sleep.assert_not_called()
+    
+    @patch('time.sleep')
+    @patch('requests.Session.post')
+    def test_retry_after_beyond_cap_fails_fast(self, mock_post, mock_sleep, token_generator):
+        """Test that a Retry-After longer than the sleep cap is not retried."""
+        mock_response = Mock(status_code=429, headers={"Retry-After": "600"})
+        mock_response.raise_for_status.side_effect = Exception("429 Too Many Requests")
+        mock_post.return_value = mock_response
+        
+        with pytest.raises(Exception):
+            token_generator.generate_installation_token()
+        
+        assert mock_post.call_count == 1
+        mock_sleep.assert_not_called()
+    
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_permission_403_not_retried(self, mock_get, mock_sleep, token_generator):
+        """Test that a 403 without rate limit headers fails immediately."""
+        mock_response = Mock(status_code=403, headers={"X-RateLimit-Remaining": "4999"})
+        mock_response.raise_for_status.side_effect = Exception("403 Forbidden")
+        mock_get.return_value = mock_response
+        
+        with pytest.raises(Exception):
+            token_generator.validate_credentials()
+        
+        assert mock_get.call_count == 1
+        mock_sleep.assert_not_called()
+    
+    @patch('requests.Session.post')
+    def test_generate_installation_tokens_bulk(self, mock_post, token_generator):
+        """Test generating tokens for several installations at once."""
+        def respond(url, **kwargs):
+            installation_id = url.split("/")[-2]
+            return Mock(
+                status_code=201,
+                content=json.dumps({
+                    "token": f"ghs_token_{installation_id}",
+                    "expires_at": "2099-01-15T12:00:00Z",
+                    "permissions": {},
+                }).encode()
+            )
+        mock_post.side_effect = respond
+        
+        results = token_generator.generate_installation_tokens_bulk(
+            ["12345678", "87654321", 11111111, "12345678", 87654321]
+        )
+        
+        assert set(results) == {"12345678", "87654321", "11111111"}
+        assert results["87654321"]["token"] == "ghs_token_87654321"
+        assert results["11111111"]["token"] == "ghs_token_11111111"
+        
+        # The generator's own installation token is cached
+        assert token_generator.generate_installation_token()["token"] == "ghs_token_12345678"
+        assert mock_post.call_count == 3
+    
     def test_get_token_expiry_seconds(self, token_generator):
         """Test token expiry calculation."""
         # Future expiry
@@ -204,6 +526,20 @@ class TestGitHubAppTokenGenerator:
         seconds = token_generator.get_token_expiry_seconds(past)
         assert seconds < 0
     
+    def test_get_token_expiry_seconds_from_result(self, token_generator):
+        """Test token expiry calculation from a token result dict."""
+        result = {
+            "expires_at": "2020-01-15T12:00:00Z",
+            "expires_at_epoch": int(time.time()) + 3600,
+        }
+        
+        # The pre-parsed epoch is preferred over the ISO string
+        assert 3590 < token_generator.get_token_expiry_seconds(result) <= 3600
+        assert not token_generator.should_refresh_token(result)
+        
+        # Dicts without the epoch fall back to parsing expires_at
+        assert token_generator.get_token_expiry_seconds({"expires_at": "2020-01-15T12:00:00Z"}) < 0
+    
     def test_should_refresh_token(self, token_generator):
         """Test token refresh decision."""
         # Far future - should not refresh
@@ -214,17 +550,18 @@ class TestGitHubAppTokenGenerator:
         past = "2020-01-15T12:00:00Z"
         assert token_generator.should_refresh_token(past)
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_validate_credentials_success(self, mock_get, token_generator):
         """Test credential validation success."""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "id": 123456,
             "name": "test-app",
             "owner": {"login": "test-owner"},
             "permissions": {"contents": "read"}
-        }
+        }).encode()
+        mock_response.headers = {}
         mock_get.return_value = mock_response
         
         result = token_generator.validate_credentials()
@@ -232,7 +569,7 @@ class TestGitHubAppTokenGenerator:
         assert result["id"] == 123456
         assert result["name"] == "test-app"
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_validate_credentials_failure(self, mock_get, token_generator):
         """Test credential validation failure."""
         mock_response = Mock()
@@ -242,6 +579,66 @@ class TestGitHubAppTokenGenerator:
         
         with pytest.raises(Exception):
             token_generator.validate_credentials()
+    
+    @patch('requests.Session.get')
+    def test_validate_credentials_etag_cache(self, mock_get, token_generator, isolated_etag_cache):
+        """Test that a 304 Not Modified response returns the cached body."""
+        app_info = {"id": 123456, "name": "test-app"}
+        mock_get.return_value = Mock(
+            status_code=200,
+            headers={"ETag": '"abc123"'},
+            content=json.dumps(app_info).encode()
+        )
+        
+        assert token_generator.validate_credentials() == app_info
+        assert "If-None-Match" not in mock_get.call_args[1]["headers"]
+        assert isolated_etag_cache.exists()
+        
+        # Second call sends the ETag and gets an empty 304
+        mock_get.return_value = Mock(status_code=304, headers={})
+        
+        assert token_generator.validate_credentials() == app_info
+        assert mock_get.call_args[1]["headers"]["If-None-Match"] == '"abc123"'
+    
+    @pytest.mark.parametrize("cache_contents", [
+        "[]",
+        '"not a dict"',
+        json.dumps({"https://api.github.com/app": {"body": {"id": 1}}}),
+        json.dumps({"https://api.github.com/app": "stale"}),
+        "{not json",
+    ])
+    @patch('requests.Session.get')
+    def test_malformed_etag_cache_ignored(self, mock_get, cache_contents, token_generator, isolated_etag_cache):
+        """Test that a corrupt or wrongly shaped cache file is treated as empty."""
+        isolated_etag_cache.parent.mkdir(parents=True)
+        isolated_etag_cache.write_text(cache_contents)
+        mock_get.return_value = Mock(
+            status_code=200,
+            headers={"ETag": '"fresh"'},
+            content=json.dumps({"id": 123456}).encode()
+        )
+        
+        assert token_generator.validate_credentials() == {"id": 123456}
+        assert "If-None-Match" not in mock_get.call_args[1]["headers"]
+        
+        # The cache is rewritten in the expected shape
+        cache = json.loads(isolated_etag_cache.read_text())
+        assert cache["https://api.github.com/app"]["etag"] == '"fresh"'
+    
+    @patch('requests.Session.get')
+    def test_etag_cache_file_is_private(self, mock_get, token_generator, isolated_etag_cache):
+        """Test that the ETag cache is written owner-only with no temp files left."""
+        mock_get.return_value = Mock(
+            status_code=200,
+            headers={"ETag": '"abc123"'},
+            content=json.dumps({"id": 123456}).encode()
+        )
+        
+        token_generator.validate_credentials()
+        
+        assert isolated_etag_cache.stat().st_mode & 0o777 == 0o600
+        assert isolated_etag_cache.parent.stat().st_mode & 0o777 == 0o700
+        assert [p.name for p in isolated_etag_cache.parent.iterdir()] == ["github-etags.json"]
 
 
 # =============================================================================
@@ -350,6 +747,102 @@ class TestMCPConfigGenerator:
             assert mode & 0o777 == 0o600
 
 
+class TestRedactedConfigDisplay:
+    """Tests for the redacted MCP config printed by the validation CLI."""
+    
+    @pytest.mark.parametrize("command,args", [
+        ("npx", ["-y", "@github/github-mcp-server"]),
+        ("node", []),
+        ('my"cmd', ['quoted "arg"', "multi\nline", "back\\slash"]),
+        ("__ARGS__", ["a"]),
+        ("npx", ["__CMD__", "__ARGS__"]),
+    ])
+    def test_matches_json_dumps(self, command, args):
+        """Test that the template output matches indented json.dumps."""
+        display_config = {
+            "mcpServers": {
+                "github": {
+                    "command": command,
+                    "args": args,
+                    "env": {"GITHUB_PERSONAL_ACCESS_TOKEN": "[REDACTED]"}
+                }
+            }
+        }
+        expected = "\n".join(
+            "      " + line
+            for line in json.dumps(display_config, indent=2).split("\n")
+        )
+        
+        assert validation_cli.format_redacted_config(command, args) == expected
+
+
+class TestApiAccessStep:
+    """Tests for step 3 of the validation CLI."""
+    
+    @patch('requests.Session.get')
+    def test_scoped_token_skips_api_call(self, mock_get, capsys):
+        """Test that repositories from the token response are used without a GET."""
+        token_result = {
+            "token": "ghs_test",
+            "_repositories": [
+                {"full_name": "org/public-repo", "private": False},
+                {"full_name": "org/private-repo", "private": True},
+            ],
+        }
+        
+        assert validation_cli.test_api_access("ghs_test", token_result=token_result)
+        
+        mock_get.assert_not_called()
+        output = capsys.readouterr().out
+        assert "Token scoped to 2 repositories" in output
+        assert "not re-verified" in output
+        assert "org/public-repo" in output
+        assert "org/private-repo" in output
+    
+    @pytest.mark.parametrize("token_result", [
+        None,
+        {"token": "ghs_test", "_repositories": None},
+    ])
+    def test_unscoped_token_lists_repositories(self, token_result, capsys):
+        """Test that an unscoped token is checked with a paged GET."""
+        session = Mock()
+        session.get.return_value = Mock(
+            status_code=200,
+            headers={},
+            content=json.dumps({
+                "total_count": 1,
+                "repositories": [{"full_name": "org/repo", "private": False}],
+            }).encode()
+        )
+        
+        assert validation_cli.test_api_access(
+            "ghs_test", token_result=token_result, session=session
+        )
+        
+        call_args = session.get.call_args
+        assert call_args[0][0] == "https://api.github.com/installation/repositories"
+        assert call_args[1]["params"] == {"per_page": validation_cli.REPO_DISPLAY_LIMIT}
+        assert call_args[1]["headers"]["Authorization"] == "Bearer ghs_test"
+        assert "Found 1 accessible repositories" in capsys.readouterr().out
+
+
+class TestValidationMain:
+    """Tests for the validation CLI entry point."""
+    
+    def test_main_restores_line_buffering(self, monkeypatch):
+        """Test that main() puts stdout back the way it found it on exit."""
+        for var in ("GITHUB_APP_ID", "GITHUB_APP_PRIVATE_KEY_PATH", "GITHUB_APP_INSTALLATION_ID"):
+            monkeypatch.delenv(var, raising=False)
+        monkeypatch.setattr(sys, "argv", ["test_github_app.py"])
+        stdout = io.TextIOWrapper(io.BytesIO(), line_buffering=True)
+        monkeypatch.setattr(sys, "stdout", stdout)
+        
+        with pytest.raises(SystemExit):
+            validation_cli.main()
+        
+        assert stdout.line_buffering
+
+
 class TestCreateMCPConfigForAgent:
     """Tests for the convenience function."""
     
@@ -375,24 +868,25 @@ class TestCreateMCPConfigForAgent:
 class TestFullTokenFlow:
     """Tests that verify the complete token generation flow."""
     
-    @patch('requests.post')
-    @patch('requests.get')
+    @patch('requests.Session.post')
+    @patch('requests.Session.get')
     def test_complete_flow(self, mock_get, mock_post, temp_key_file):
         """Test complete flow from validation to MCP config."""
         # Mock validate credentials
         mock_get.return_value = Mock(
             status_code=200,
-            json=lambda: {"id": 123, "name": "test-app", "owner": {"login": "owner"}}
+            headers={},
+            content=json.dumps({"id": 123, "name": "test-app", "owner": {"login": "owner"}}).encode()
         )
         
         # Mock token generation
         mock_post.return_value = Mock(
             status_code=201,
-            json=lambda: {
+            content=json.dumps({
                 "token": "ghs_complete_flow_token",
                 "expires_at": "2024-01-15T12:00:00Z",
                 "permissions": {"contents": "read"}
-            }
+            }).encode()
         )
         
         # Create generator